@@ -3,8 +3,12 @@
 ## -----------------------------------------------------------------------------
 import streamlit as st
 import requests
-from PIL import Image
-from io import BytesIO
+from itertools import cycle
+from concurrent.futures import ThreadPoolExecutor
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from ratelimit import limits, sleep_and_retry
 
 # ---- PAGE CONFIG ----
 # Set the page configuration. This should be the first Streamlit command.
@@ -19,7 +23,39 @@ st.set_page_config(
 # Central place for API configurations
 BASE_URL = "https://api.themoviedb.org/3"
 IMAGE_BASE_URL = "https://image.tmdb.org/t/p/w500"
-POSTER_BASE_URL = "https://image.tmdb.org/t/p/original"
+# w780 is plenty for the poster column and stills carousel; "original"
+# shipped multi-MB source files the browser only scaled down anyway.
+POSTER_BASE_URL = "https://image.tmdb.org/t/p/w780"
+
+# ---- HTTP SESSION ----
+
+@st.cache_resource(show_spinner=False)
+def get_session():
+    """Builds the shared TMDb session once per process.
+
+    st.cache_resource keeps the same object across reruns — a plain
+    module-level session would be rebuilt on every interaction, losing the
+    pooled connections and reopening the sqlite store each time. Keep-alive
+    amortizes the TLS handshake over many calls, the Retry handles transient
+    failures with a short backoff, and the sqlite backend persists TMDb
+    responses for a day so popular queries survive restarts and redeploys
+    (st.cache_data alone is wiped on every restart).
+    """
+    session = requests_cache.CachedSession(
+        "tmdb_cache",
+        backend="sqlite",
+        expire_after=86400,
+        allowable_methods=("GET",),
+    )
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=5, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504]),
+        ),
+    )
+    return session
 
 # ---- API KEY HANDLING ----
 # Securely get API key from Streamlit secrets and handle missing key
@@ -30,38 +66,106 @@ except (KeyError, FileNotFoundError):
     st.stop() # Stop the app if the key is missing
 
 # ---- STATE MANAGEMENT ----
-# Initialize session state for favorites and movie data to prevent re-fetching
+# Initialize session state for favorites and movie data to prevent re-fetching.
+# Favorites are a set so membership checks and removal stay O(1) as it grows.
 if "favorites" not in st.session_state:
-    st.session_state.favorites = []
+    st.session_state.favorites = set()
 if "current_movie" not in st.session_state:
     st.session_state.current_movie = None
+if "trailer_key" not in st.session_state:
+    st.session_state.trailer_key = None
 
 # ---- HELPER FUNCTIONS ----
 
+@st.cache_resource(show_spinner=False)
+def build_tmdb_get():
+    """Creates the rate-limited TMDb GET function once per process.
+
+    The token bucket lives inside the @limits decorator instance, so the
+    decorated function must be built once and shared — decorating a
+    module-level function would hand every rerun a fresh, empty bucket.
+    """
+    session = get_session()
+
+    @sleep_and_retry
+    @limits(calls=35, period=10)
+    def _tmdb_get(url, params):
+        return session.get(url, params=params, timeout=5)
+
+    return _tmdb_get
+
+def tmdb_get(url, params):
+    """Issues a TMDb GET through the shared session, paced under the API limit.
+
+    TMDb allows 40 requests per 10 seconds per IP; the process-wide token
+    bucket keeps us at 35 so bursts never trip the limiter and pay the 429
+    backoff penalty.
+    """
+    return build_tmdb_get()(url, params)
+
+@st.cache_resource(show_spinner=False)
+def get_executor():
+    """One background pool per process for cache warm-ups.
+
+    A module-level ThreadPoolExecutor would spawn eight fresh worker
+    threads on every rerun and leave the old pools lingering until GC.
+    """
+    return ThreadPoolExecutor(max_workers=8)
+
+def prefetch_movie_details(fetch, movie_id):
+    """Warms the HTTP cache for a movie off the main thread.
+
+    Issues the same request get_movie_details would. `fetch` is the
+    rate-limited getter, resolved on the script thread and passed in so the
+    worker makes no Streamlit calls; a later lookup for this id then hits
+    the disk cache instead of the network.
+    """
+    params = {"api_key": API_KEY, "append_to_response": "videos,images,credits,similar"}
+    try:
+        fetch(f"{BASE_URL}/movie/{movie_id}", params)
+    except requests.exceptions.RequestException:
+        pass # Best-effort: a failed prefetch just means a normal fetch later
+
+@st.cache_data(ttl=3600, show_spinner=False)
 def search_movie(query):
-    """Searches for a movie on TMDb and returns the first result."""
+    """Searches for a movie on TMDb and returns the first result.
+
+    Results are cached for an hour so reruns (widget clicks, tab switches)
+    don't re-hit the network for the same query. Network failures raise
+    RequestException to the caller — st.cache_data doesn't cache raised
+    exceptions, so a transient blip isn't memoized for the full hour.
+    """
     search_url = f"{BASE_URL}/search/movie"
     params = {"api_key": API_KEY, "query": query, "language": "en-US"}
-    try:
-        response = requests.get(search_url, params=params)
-        response.raise_for_status() # Checks for HTTP errors (like 401, 404)
-        results = response.json().get("results", [])
-        return results[0] if results else None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to connect to TMDb API: {e}")
-        return None
+    response = tmdb_get(search_url, params)
+    response.raise_for_status() # Checks for HTTP errors (like 401, 404)
+    results = response.json().get("results", [])
+    return results[0] if results else None
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def get_movie_details(movie_id):
-    """Fetches detailed information for a specific movie, including credits."""
+    """Fetches detailed information for a specific movie, including credits.
+
+    Cached per movie id for an hour — the payload is immutable enough that
+    serving a copy from the cache beats a ~200-500ms round trip on every
+    rerun. Raises RequestException on failure rather than caching a None.
+    """
     details_url = f"{BASE_URL}/movie/{movie_id}"
     params = {"api_key": API_KEY, "append_to_response": "videos,images,credits,similar"}
-    try:
-        response = requests.get(details_url, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to fetch movie details: {e}")
-        return None
+    response = tmdb_get(details_url, params)
+    response.raise_for_status()
+    return response.json()
+
+def toggle_favorite(movie_title):
+    """Adds or removes a title from favorites.
+
+    Used as a button callback: it runs before the rerun Streamlit already
+    performs on a click, so no explicit st.experimental_rerun() is needed.
+    """
+    if movie_title in st.session_state.favorites:
+        st.session_state.favorites.discard(movie_title)
+    else:
+        st.session_state.favorites.add(movie_title)
 
 def display_favorites():
     """Renders the list of favorite movies in the sidebar."""
@@ -69,11 +173,14 @@ def display_favorites():
     if not st.session_state.favorites:
         st.sidebar.info("Your favorite movies will appear here. Add some!")
     else:
-        # Create a copy for safe iteration while removing items
-        for fav_title in st.session_state.favorites[:]:
-            if st.sidebar.button(f"🗑️ {fav_title}", key=f"fav_{fav_title}"):
-                st.session_state.favorites.remove(fav_title)
-                st.experimental_rerun() # Rerun the app to update the list instantly
+        # Sort for a stable display order; sets don't keep insertion order
+        for fav_title in sorted(st.session_state.favorites):
+            st.sidebar.button(
+                f"🗑️ {fav_title}",
+                key=f"fav_{fav_title}",
+                on_click=toggle_favorite,
+                args=(fav_title,),
+            )
 
 # ---- MAIN APP LAYOUT ----
 
@@ -88,15 +195,42 @@ movie_query = st.text_input("Enter a movie title", placeholder="e.g., Blade Runn
 
 if movie_query:
     with st.spinner('Searching for your movie...'): # Loading spinner for better UX
-        movie_result = search_movie(movie_query)
+        try:
+            movie_result = search_movie(movie_query)
+        except requests.exceptions.RequestException as e:
+            st.error(f"Failed to connect to TMDb API: {e}")
+            movie_result = None
 
     if movie_result:
         # Fetch all details in one go
         with st.spinner('Gathering all the details...'):
-            st.session_state.current_movie = get_movie_details(movie_result["id"])
+            try:
+                st.session_state.current_movie = get_movie_details(movie_result["id"])
+            except requests.exceptions.RequestException as e:
+                st.error(f"Failed to fetch movie details: {e}")
+                st.session_state.current_movie = None
+        # Pick the trailer once per movie instead of re-scanning the video
+        # list on every rerun of the trailer tab
+        videos = (st.session_state.current_movie or {}).get("videos", {}).get("results", [])
+        st.session_state.trailer_key = next(
+            (v["key"] for v in videos if v["type"] == "Trailer" and v["site"] == "YouTube"),
+            None,
+        )
+        # Warm the cache for the similar movies while the user reads this
+        # one — searching any of them next skips the details round trip.
+        # This whole branch runs on every rerun while the search box has
+        # text, so remember which movie was prefetched and only submit the
+        # jobs once per new search.
+        if st.session_state.get("prefetched_movie_id") != movie_result["id"]:
+            st.session_state.prefetched_movie_id = movie_result["id"]
+            fetch = build_tmdb_get()
+            similar = (st.session_state.current_movie or {}).get("similar", {}).get("results", [])
+            for smovie in similar[:8]:
+                get_executor().submit(prefetch_movie_details, fetch, smovie["id"])
     else:
         st.error("No results found. Try a different title!")
         st.session_state.current_movie = None # Clear previous results
+        st.session_state.trailer_key = None
 
 # --- DISPLAY MOVIE DETAILS ---
 if st.session_state.current_movie:
@@ -132,14 +266,12 @@ if st.session_state.current_movie:
         # --- FAVORITE BUTTON LOGIC ---
         is_favorited = movie_title in st.session_state.favorites
         button_text = "❤️ Remove from Favorites" if is_favorited else "🤍 Add to Favorites"
-        if st.button(button_text, use_container_width=True):
-            if is_favorited:
-                st.session_state.favorites.remove(movie_title)
-                st.success(f"Removed {movie_title} from favorites!")
-            else:
-                st.session_state.favorites.append(movie_title)
-                st.success(f"Added {movie_title} to favorites!")
-            st.experimental_rerun()
+        st.button(
+            button_text,
+            use_container_width=True,
+            on_click=toggle_favorite,
+            args=(movie_title,),
+        )
 
     st.markdown("---") # Visual separator
 
@@ -148,10 +280,8 @@ if st.session_state.current_movie:
 
     with tab1:
         st.subheader("Watch Trailer")
-        videos = movie.get("videos", {}).get("results", [])
-        trailer = next((v for v in videos if v["type"] == "Trailer" and v["site"] == "YouTube"), None)
-        if trailer:
-            st.video(f"https://www.youtube.com/watch?v={trailer['key']}")
+        if st.session_state.trailer_key:
+            st.video(f"https://www.youtube.com/watch?v={st.session_state.trailer_key}")
         else:
             st.info("No trailer available for this movie.")
 
@@ -161,8 +291,8 @@ if st.session_state.current_movie:
         cast = credits.get("cast", [])
         if cast:
             cols = st.columns(5)
-            for idx, person in enumerate(cast[:10]): # Display top 10 actors
-                with cols[idx % 5]:
+            for col, person in zip(cycle(cols), cast[:10]): # Display top 10 actors
+                with col:
                     if person.get("profile_path"):
                         st.image(IMAGE_BASE_URL + person["profile_path"])
                         st.write(f"**{person['name']}**")
@@ -184,8 +314,8 @@ if st.session_state.current_movie:
         similar_movies = movie.get("similar", {}).get("results", [])
         if similar_movies:
             cols = st.columns(4)
-            for idx, smovie in enumerate(similar_movies[:8]):
-                with cols[idx % 4]:
+            for col, smovie in zip(cycle(cols), similar_movies[:8]):
+                with col:
                     if smovie.get("poster_path"):
                         st.image(IMAGE_BASE_URL + smovie["poster_path"], use_container_width=True, caption=smovie["title"])
         else: